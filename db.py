@@ -0,0 +1,627 @@
+"""MySQL storage for the expense tracker.
+
+Kept free of GUI imports so the headless server and scripts can use it
+without tkinter, matplotlib, fpdf or openpyxl installed.
+"""
+import mysql.connector
+from mysql.connector import errorcode
+from datetime import datetime
+import hashlib
+from contextlib import contextmanager
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pyarrow.ipc as ipc
+
+SNAPSHOT_BATCH_SIZE = 50000
+
+CHANGE_FEED_LIMIT = 500
+CHANGE_RETENTION_DAYS = 30
+CHANGE_PRUNE_BATCH = 10000
+
+# categories.id is SMALLINT UNSIGNED, shared by built-in and every user's custom categories
+MAX_CATEGORY_ID = 65535
+
+DEFAULT_CATEGORIES = ["Food & Dining", "Transportation", "Shopping", "Healthcare",
+                      "Entertainment", "Bills & Utilities", "Education", "Other"]
+
+SNAPSHOT_SCHEMA = pa.schema([
+    ("id", pa.int32()),
+    ("user_id", pa.int32()),
+    ("expense_name", pa.string()),
+    ("category", pa.dictionary(pa.int32(), pa.string())),
+    ("amount", pa.decimal128(10, 2)),
+    ("exp_date", pa.date32()),
+    ("exp_time", pa.time64("us")),
+    ("created_at", pa.timestamp("s")),
+])
+
+SNAPSHOT_FORMATS = ("parquet", "feather")
+
+def snapshot_format(path):
+    return "feather" if path.lower().endswith((".feather", ".arrow")) else "parquet"
+
+def snapshot_row_count(path, fmt):
+    # Reads only file metadata (Parquet footer / memory-mapped IPC batches)
+    if fmt == "parquet":
+        return pq.ParquetFile(path).metadata.num_rows
+    reader = ipc.open_file(pa.memory_map(path))
+    return sum(reader.get_batch(i).num_rows for i in range(reader.num_record_batches))
+
+class Database:
+    def __init__(self, host="localhost", user="root", password="root"):
+        temp_conn = mysql.connector.connect(
+            host=host,
+            user=user,
+            password=password
+        )
+        temp_cursor = temp_conn.cursor()
+        temp_cursor.execute("CREATE DATABASE IF NOT EXISTS expense_tracker")
+        temp_conn.close()
+        
+        self.conn = mysql.connector.connect(
+            host=host,
+            user=user,
+            password=password,
+            database="expense_tracker"
+        )
+        self._open_session()
+        self.create_tables()
+        self.prune_changes()
+    
+    def _open_session(self):
+        self.cursor = self.conn.cursor()
+        # Long-lived connections must see rows committed by other clients
+        self.cursor.execute("SET SESSION TRANSACTION ISOLATION LEVEL READ COMMITTED")
+        # user_id -> {category name: category id}, global categories first
+        self._category_cache = {}
+    
+    def ensure_connection(self):
+        # Reconnects if the server dropped the connection (wait_timeout, restart). The new
+        # session needs its settings again, and any uncommitted categories in the cache are gone.
+        try:
+            self.conn.ping()
+        except mysql.connector.Error:
+            self.conn.reconnect(attempts=3, delay=1)
+            self._open_session()
+    
+    def create_tables(self):
+        self.cursor.execute("""
+            CREATE TABLE IF NOT EXISTS users (
+                id INT AUTO_INCREMENT PRIMARY KEY,
+                username VARCHAR(100) UNIQUE NOT NULL,
+                email VARCHAR(100) UNIQUE NOT NULL,
+                password VARCHAR(255) NOT NULL,
+                monthly_budget DECIMAL(10,2) DEFAULT 0,
+                dark_mode BOOLEAN DEFAULT FALSE,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                is_active BOOLEAN DEFAULT TRUE
+            )
+        """)
+        
+        # user_id NULL marks a built-in category shared by every user
+        self.cursor.execute("""
+            CREATE TABLE IF NOT EXISTS categories (
+                id SMALLINT UNSIGNED AUTO_INCREMENT PRIMARY KEY,
+                user_id INT NULL,
+                name VARCHAR(100) NOT NULL,
+                UNIQUE KEY uq_user_category (user_id, name),
+                FOREIGN KEY (user_id) REFERENCES users(id)
+            )
+        """)
+        
+        with self._schema_lock():
+            self.cursor.execute("SELECT COUNT(*) FROM categories WHERE user_id IS NULL")
+            if self.cursor.fetchone()[0] == 0:
+                self.cursor.executemany(
+                    "INSERT INTO categories (name) VALUES (%s)",
+                    [(name,) for name in DEFAULT_CATEGORIES]
+                )
+                self.conn.commit()
+        
+        self.cursor.execute("""
+            CREATE TABLE IF NOT EXISTS expenses (
+                id INT AUTO_INCREMENT PRIMARY KEY,
+                user_id INT,
+                expense_name VARCHAR(255),
+                category_id SMALLINT UNSIGNED NOT NULL,
+                amount DECIMAL(10,2),
+                exp_date DATE,
+                exp_time TIME,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                KEY idx_user_category (user_id, category_id),
+                FOREIGN KEY (user_id) REFERENCES users(id),
+                FOREIGN KEY (category_id) REFERENCES categories(id)
+            )
+        """)
+        
+        self.migrate_expense_categories()
+        # Lets get_category_totals group a user's rows in index order instead of via a temporary table
+        self._ensure_index("expenses", "idx_user_category", "user_id, category_id")
+        
+        # Per-user change feed; id is the high-water mark clients poll from
+        self.cursor.execute("""
+            CREATE TABLE IF NOT EXISTS expense_changes (
+                id BIGINT AUTO_INCREMENT PRIMARY KEY,
+                user_id INT NOT NULL,
+                expense_id INT NULL,
+                op ENUM('upsert', 'delete', 'reload') NOT NULL,
+                changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                KEY idx_user_change (user_id, id),
+                KEY idx_changed_at (changed_at)
+            )
+        """)
+        self._ensure_index("expense_changes", "idx_changed_at", "changed_at")
+        
+        admin_pass = hashlib.sha256("admin123".encode()).hexdigest()
+        try:
+            self.cursor.execute(
+                "INSERT INTO users (username, email, password) VALUES (%s, %s, %s)",
+                ("admin", "admin@expense.com", admin_pass)
+            )
+            self.conn.commit()
+        except:
+            pass
+    
+    @contextmanager
+    def _schema_lock(self):
+        # Named lock so instances starting together don't seed or migrate the schema twice
+        self.cursor.execute("SELECT GET_LOCK('expense_tracker_schema', 60)")
+        if not self.cursor.fetchone()[0]:
+            raise RuntimeError("Timed out waiting for another instance to set up the database")
+        try:
+            yield
+        finally:
+            self.cursor.execute("SELECT RELEASE_LOCK('expense_tracker_schema')")
+            self.cursor.fetchall()
+    
+    def _ensure_index(self, table, name, columns):
+        self.cursor.execute(
+            "SELECT COUNT(*) FROM information_schema.STATISTICS "
+            "WHERE TABLE_SCHEMA=DATABASE() AND TABLE_NAME=%s AND INDEX_NAME=%s",
+            (table, name)
+        )
+        if self.cursor.fetchone()[0] == 0:
+            self.cursor.execute(f"ALTER TABLE {table} ADD INDEX {name} ({columns})")
+    
+    def _column_exists(self, table, column):
+        self.cursor.execute(
+            "SELECT COUNT(*) FROM information_schema.COLUMNS "
+            "WHERE TABLE_SCHEMA=DATABASE() AND TABLE_NAME=%s AND COLUMN_NAME=%s",
+            (table, column)
+        )
+        return self.cursor.fetchone()[0] > 0
+    
+    def migrate_expense_categories(self):
+        # Older databases store the category name on every expense row
+        if not self._column_exists("expenses", "category"):
+            return
+        
+        # Every step below is safe to re-run, so a migration that died halfway resumes on the next start
+        with self._schema_lock():
+            if self._column_exists("expenses", "category"):
+                self._migrate_expense_categories()
+    
+    def _migrate_expense_categories(self):
+        if not self._column_exists("expenses", "category_id"):
+            self.cursor.execute("ALTER TABLE expenses ADD COLUMN category_id SMALLINT UNSIGNED NULL AFTER category")
+        # Names that are not built in become custom categories of the user who used them
+        self.cursor.execute("""
+            INSERT IGNORE INTO categories (user_id, name)
+            SELECT DISTINCT e.user_id, e.category FROM expenses e
+            WHERE e.user_id IS NOT NULL AND e.category IS NOT NULL
+              AND e.category NOT IN (SELECT name FROM categories WHERE user_id IS NULL)
+        """)
+        self.cursor.execute("""
+            UPDATE expenses e JOIN categories c
+              ON c.name = e.category AND (c.user_id IS NULL OR c.user_id = e.user_id)
+            SET e.category_id = c.id
+            WHERE e.category_id IS NULL
+        """)
+        self.cursor.execute(
+            "UPDATE expenses SET category_id=(SELECT id FROM categories WHERE user_id IS NULL AND name='Other') "
+            "WHERE category_id IS NULL"
+        )
+        self.conn.commit()
+        self.cursor.execute(
+            "ALTER TABLE expenses MODIFY category_id SMALLINT UNSIGNED NOT NULL, DROP COLUMN category, "
+            "ADD FOREIGN KEY (category_id) REFERENCES categories(id)"
+        )
+    
+    def register_user(self, username, email, password):
+        hashed_pw = hashlib.sha256(password.encode()).hexdigest()
+        try:
+            self.cursor.execute(
+                "INSERT INTO users (username, email, password) VALUES (%s, %s, %s)",
+                (username, email, hashed_pw)
+            )
+            self.conn.commit()
+            return True
+        except mysql.connector.IntegrityError:
+            return False
+    
+    def login_user(self, username, password):
+        hashed_pw = hashlib.sha256(password.encode()).hexdigest()
+        self.cursor.execute(
+            "SELECT id, username, monthly_budget, dark_mode FROM users WHERE username=%s AND password=%s",
+            (username, hashed_pw)
+        )
+        return self.cursor.fetchone()
+    
+    def _load_categories(self, user_id):
+        if user_id not in self._category_cache:
+            self.cursor.execute(
+                "SELECT id, name FROM categories WHERE user_id IS NULL OR user_id=%s ORDER BY user_id IS NOT NULL, id",
+                (user_id,)
+            )
+            self._category_cache[user_id] = {name: cat_id for cat_id, name in self.cursor.fetchall()}
+        return self._category_cache[user_id]
+    
+    def get_categories(self, user_id):
+        # Read fresh: another connection may have added a category since this one cached the list.
+        # Cached name -> id lookups only miss on a stale cache or a different spelling, and
+        # get_category_id recovers from both.
+        self._category_cache.pop(user_id, None)
+        return list(self._load_categories(user_id))
+    
+    def _find_category(self, user_id, name):
+        # Matches names the way the unique key does, under the column collation ("coffee" is
+        # "Coffee"), preferring the built-in category over a user's own
+        self.cursor.execute(
+            "SELECT id FROM categories WHERE name=%s AND (user_id IS NULL OR user_id=%s) "
+            "ORDER BY user_id IS NOT NULL, id LIMIT 1",
+            (name, user_id)
+        )
+        row = self.cursor.fetchone()
+        return row[0] if row else None
+    
+    def add_category(self, user_id, name, commit=True):
+        if self._find_category(user_id, name) is not None:
+            return False
+        try:
+            self.cursor.execute(
+                "INSERT INTO categories (user_id, name) VALUES (%s, %s)",
+                (user_id, name)
+            )
+            if commit:
+                self.conn.commit()
+            return True
+        except mysql.connector.Error as err:
+            # Another connection added the same name in the meantime
+            if err.errno == errorcode.ER_DUP_ENTRY and self._find_category(user_id, name) is not None:
+                return False
+            # Otherwise AUTO_INCREMENT hit the top of SMALLINT UNSIGNED
+            if err.errno in (errorcode.ER_DUP_ENTRY, errorcode.ER_AUTOINC_READ_FAILED, errorcode.ER_WARN_DATA_OUT_OF_RANGE):
+                raise RuntimeError(f"All {MAX_CATEGORY_ID} category ids are in use; no more categories can be added") from err
+            raise
+        finally:
+            self._category_cache.pop(user_id, None)
+    
+    def get_category_id(self, user_id, name, commit=True):
+        categories = self._load_categories(user_id)
+        if name in categories:
+            return categories[name]
+        cat_id = self._find_category(user_id, name)
+        if cat_id is None:
+            self.add_category(user_id, name, commit)
+            cat_id = self._find_category(user_id, name)
+        # Cache this spelling too so the next lookup skips the round trip
+        self._load_categories(user_id)[name] = cat_id
+        return cat_id
+    
+    def _lock_user(self, user_id):
+        # Serializes a user's writers so change ids are handed out in commit order and a
+        # poller never skips past a late commit. Must come before any insert that references
+        # the user (expenses, categories): their FK checks take a shared lock on this row,
+        # and upgrading that to FOR UPDATE deadlocks against a second writer.
+        self.cursor.execute("SELECT id FROM users WHERE id=%s FOR UPDATE", (user_id,))
+        self.cursor.fetchall()
+    
+    def _log_change(self, user_id, exp_id, op):
+        # Caller holds _lock_user(user_id)
+        self.cursor.execute(
+            "INSERT INTO expense_changes (user_id, expense_id, op) VALUES (%s, %s, %s)",
+            (user_id, exp_id, op)
+        )
+    
+    @contextmanager
+    def _user_transaction(self, user_id):
+        # New category, expense row and change row commit together, and the user lock is
+        # held until then. Nothing inside may commit early (hence commit=False below).
+        try:
+            self._lock_user(user_id)
+            yield
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            # May hold ids of categories that were just rolled back
+            self._category_cache.pop(user_id, None)
+            raise
+    
+    def add_expense(self, user_id, name, category, amount, date, time):
+        with self._user_transaction(user_id):
+            self.cursor.execute(
+                "INSERT INTO expenses (user_id, expense_name, category_id, amount, exp_date, exp_time) VALUES (%s, %s, %s, %s, %s, %s)",
+                (user_id, name, self.get_category_id(user_id, category, commit=False), amount, date, time)
+            )
+            self._log_change(user_id, self.cursor.lastrowid, "upsert")
+    
+    def update_expense(self, user_id, exp_id, name, category, amount, date, time):
+        with self._user_transaction(user_id):
+            self.cursor.execute(
+                "UPDATE expenses SET expense_name=%s, category_id=%s, amount=%s, exp_date=%s, exp_time=%s WHERE id=%s AND user_id=%s",
+                (name, self.get_category_id(user_id, category, commit=False), amount, date, time, exp_id, user_id)
+            )
+            if self.cursor.rowcount:
+                self._log_change(user_id, exp_id, "upsert")
+    
+    def delete_expense(self, user_id, exp_id):
+        with self._user_transaction(user_id):
+            self.cursor.execute("DELETE FROM expenses WHERE id=%s AND user_id=%s", (exp_id, user_id))
+            if self.cursor.rowcount:
+                self._log_change(user_id, exp_id, "delete")
+    
+    def prune_changes(self, days=CHANGE_RETENTION_DAYS):
+        self.cursor.execute(
+            "SELECT MAX(id) FROM expense_changes WHERE changed_at < NOW() - INTERVAL %s DAY",
+            (days,)
+        )
+        cutoff = self.cursor.fetchone()[0]
+        if cutoff is None:
+            return 0
+        # The cutoff row itself is kept: MIN(id) then records how far the log has been pruned
+        deleted = 0
+        while True:
+            self.cursor.execute(
+                "DELETE FROM expense_changes WHERE id < %s LIMIT %s",
+                (cutoff, CHANGE_PRUNE_BATCH)
+            )
+            self.conn.commit()
+            deleted += self.cursor.rowcount
+            if self.cursor.rowcount < CHANGE_PRUNE_BATCH:
+                return deleted
+    
+    def get_change_seq(self, user_id):
+        # Never below the pruned range, so a fresh client is not sent a reload right away
+        self.cursor.execute(
+            "SELECT GREATEST("
+            "COALESCE((SELECT MAX(id) FROM expense_changes WHERE user_id=%s), 0), "
+            "COALESCE((SELECT MIN(id) FROM expense_changes), 1) - 1)",
+            (user_id,)
+        )
+        return self.cursor.fetchone()[0]
+    
+    def get_changes(self, user_id, since_seq):
+        # Returns (new_seq, [(expense_id, row)]) with the latest state of each changed expense.
+        # row is None for a deleted expense; expense_id None asks the caller to reload everything.
+        self.cursor.execute("SELECT MIN(id) FROM expense_changes")
+        oldest = self.cursor.fetchone()[0]
+        if oldest is not None and since_seq < oldest - 1:
+            # Changes after since_seq may have been pruned
+            return self.get_change_seq(user_id), [(None, None)]
+        
+        self.cursor.execute(
+            "SELECT ch.id, ch.expense_id, ch.op, e.id, e.expense_name, c.name, e.amount, e.exp_date, e.exp_time "
+            "FROM expense_changes ch "
+            "LEFT JOIN expenses e ON e.id=ch.expense_id AND e.user_id=ch.user_id "
+            "LEFT JOIN categories c ON c.id=e.category_id "
+            "WHERE ch.user_id=%s AND ch.id > %s ORDER BY ch.id LIMIT %s",
+            (user_id, since_seq, CHANGE_FEED_LIMIT + 1)
+        )
+        rows = self.cursor.fetchall()
+        if not rows:
+            return since_seq, []
+        if len(rows) > CHANGE_FEED_LIMIT or any(row[2] == "reload" for row in rows):
+            return self.get_change_seq(user_id), [(None, None)]
+        
+        latest = {}
+        for row in rows:
+            # Rows are joined with the current expense, so an edit followed by a delete yields None
+            latest[row[1]] = tuple(row[3:]) if row[3] is not None else None
+        return rows[-1][0], list(latest.items())
+    
+    def get_expenses(self, user_id, start_date=None, end_date=None):
+        if start_date and end_date:
+            self.cursor.execute(
+                "SELECT e.id, e.expense_name, c.name, e.amount, e.exp_date, e.exp_time FROM expenses e JOIN categories c ON c.id=e.category_id "
+                "WHERE e.user_id=%s AND e.exp_date BETWEEN %s AND %s ORDER BY e.exp_date DESC",
+                (user_id, start_date, end_date)
+            )
+        else:
+            self.cursor.execute(
+                "SELECT e.id, e.expense_name, c.name, e.amount, e.exp_date, e.exp_time FROM expenses e JOIN categories c ON c.id=e.category_id "
+                "WHERE e.user_id=%s ORDER BY e.exp_date DESC",
+                (user_id,)
+            )
+        return self.cursor.fetchall()
+    
+    def get_total_expense(self, user_id, start_date=None, end_date=None):
+        if start_date and end_date:
+            self.cursor.execute(
+                "SELECT SUM(amount) FROM expenses WHERE user_id=%s AND exp_date BETWEEN %s AND %s",
+                (user_id, start_date, end_date)
+            )
+        else:
+            self.cursor.execute(
+                "SELECT SUM(amount) FROM expenses WHERE user_id=%s",
+                (user_id,)
+            )
+        result = self.cursor.fetchone()[0]
+        return result if result else 0
+    
+    def get_category_totals(self, user_id, start_date=None, end_date=None):
+        if start_date and end_date:
+            self.cursor.execute(
+                "SELECT c.name, t.total FROM (SELECT category_id, SUM(amount) AS total FROM expenses "
+                "WHERE user_id=%s AND exp_date BETWEEN %s AND %s GROUP BY category_id) t JOIN categories c ON c.id=t.category_id",
+                (user_id, start_date, end_date)
+            )
+        else:
+            self.cursor.execute(
+                "SELECT c.name, t.total FROM (SELECT category_id, SUM(amount) AS total FROM expenses "
+                "WHERE user_id=%s GROUP BY category_id) t JOIN categories c ON c.id=t.category_id",
+                (user_id,)
+            )
+        return self.cursor.fetchall()
+    
+    def update_budget(self, user_id, budget):
+        self.cursor.execute("UPDATE users SET monthly_budget=%s WHERE id=%s", (budget, user_id))
+        self.conn.commit()
+    
+    def toggle_dark_mode(self, user_id, mode):
+        self.cursor.execute("UPDATE users SET dark_mode=%s WHERE id=%s", (mode, user_id))
+        self.conn.commit()
+    
+    def get_all_users(self):
+        self.cursor.execute(
+            "SELECT username, email, created_at, is_active FROM users WHERE username != 'admin'"
+        )
+        return self.cursor.fetchall()
+    
+    def iter_expense_batches(self, user_id=None, batch_size=SNAPSHOT_BATCH_SIZE):
+        # Unbuffered cursor: rows are streamed from the server instead of being loaded all at once
+        cursor = self.conn.cursor(buffered=False)
+        try:
+            if user_id is None:
+                cursor.execute(
+                    "SELECT e.id, e.user_id, e.expense_name, c.name, e.amount, e.exp_date, e.exp_time, e.created_at "
+                    "FROM expenses e JOIN categories c ON c.id=e.category_id ORDER BY e.id"
+                )
+            else:
+                cursor.execute(
+                    "SELECT e.id, e.user_id, e.expense_name, c.name, e.amount, e.exp_date, e.exp_time, e.created_at "
+                    "FROM expenses e JOIN categories c ON c.id=e.category_id WHERE e.user_id=%s ORDER BY e.id",
+                    (user_id,)
+                )
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield rows
+        finally:
+            # Stopped early (e.g. the writer failed): drain the rest so the shared connection stays usable
+            if self.conn.unread_result:
+                self.conn.consume_results()
+            cursor.close()
+    
+    def get_snapshot_categories(self, user_id=None):
+        if user_id is None:
+            self.cursor.execute("SELECT DISTINCT name FROM categories ORDER BY name")
+        else:
+            self.cursor.execute(
+                "SELECT name FROM categories WHERE user_id IS NULL OR user_id=%s ORDER BY name",
+                (user_id,)
+            )
+        return [row[0] for row in self.cursor.fetchall()]
+    
+    def _rows_to_record_batch(self, rows, dictionary, category_index):
+        columns = list(zip(*rows))
+        # TIME columns come back from the connector as timedelta
+        times = [(datetime.min + t).time() if t is not None else None for t in columns[6]]
+        categories = pa.DictionaryArray.from_arrays(
+            pa.array([category_index.get(c) for c in columns[3]], type=pa.int32()),
+            dictionary
+        )
+        return pa.record_batch([
+            pa.array(columns[0], type=pa.int32()),
+            pa.array(columns[1], type=pa.int32()),
+            pa.array(columns[2], type=pa.string()),
+            categories,
+            pa.array(columns[4], type=pa.decimal128(10, 2)),
+            pa.array(columns[5], type=pa.date32()),
+            pa.array(times, type=pa.time64("us")),
+            pa.array(columns[7], type=pa.timestamp("s")),
+        ], schema=SNAPSHOT_SCHEMA)
+    
+    def export_expenses_snapshot(self, sink, user_id=None, fmt="parquet"):
+        # One shared dictionary for every batch, so the Feather (Arrow IPC file) writer accepts it too
+        names = self.get_snapshot_categories(user_id)
+        dictionary = pa.array(names, type=pa.string())
+        category_index = {name: i for i, name in enumerate(names)}
+        
+        if fmt == "parquet":
+            writer = pq.ParquetWriter(sink, SNAPSHOT_SCHEMA, compression="zstd")
+        elif fmt == "feather":
+            writer = ipc.new_file(sink, SNAPSHOT_SCHEMA, options=ipc.IpcWriteOptions(compression="zstd"))
+        else:
+            raise ValueError(f"Unsupported snapshot format: {fmt}")
+        
+        count = 0
+        batches = self.iter_expense_batches(user_id)
+        try:
+            for rows in batches:
+                writer.write_batch(self._rows_to_record_batch(rows, dictionary, category_index))
+                count += len(rows)
+        finally:
+            # Close the generator now rather than when the traceback is freed
+            batches.close()
+            writer.close()
+        return count
+    
+    def _iter_snapshot_batches(self, source, fmt):
+        if fmt == "parquet":
+            yield from pq.ParquetFile(source).iter_batches(batch_size=SNAPSHOT_BATCH_SIZE)
+        elif fmt == "feather":
+            reader = ipc.open_file(source)
+            for i in range(reader.num_record_batches):
+                yield reader.get_batch(i)
+        else:
+            raise ValueError(f"Unsupported snapshot format: {fmt}")
+    
+    def restore_expenses_snapshot(self, source, user_id=None, fmt="parquet"):
+        # user_id given: the snapshot replaces that user's expenses; rows get new ids, so restoring
+        # twice does not duplicate anything and other users' ids in the file are never touched.
+        # user_id None (admin): rows are restored verbatim, overwriting rows with the same id.
+        # Both statements are plain INSERT ... VALUES, which executemany sends as multi-row INSERTs
+        # (REPLACE INTO would go row by row).
+        if user_id is None:
+            sql = ("INSERT INTO expenses (id, user_id, expense_name, category_id, amount, exp_date, exp_time, created_at) "
+                   "VALUES (%s, %s, %s, %s, %s, %s, %s, %s) "
+                   "ON DUPLICATE KEY UPDATE user_id=VALUES(user_id), expense_name=VALUES(expense_name), "
+                   "category_id=VALUES(category_id), amount=VALUES(amount), exp_date=VALUES(exp_date), "
+                   "exp_time=VALUES(exp_time), created_at=VALUES(created_at)")
+        else:
+            sql = ("INSERT INTO expenses (user_id, expense_name, category_id, amount, exp_date, exp_time, created_at) "
+                   "VALUES (%s, %s, %s, %s, %s, %s, %s)")
+        
+        def category_id(uid, name):
+            if uid is not None:
+                # Unknown names become custom categories of the owning user, inside the same transaction
+                return self.get_category_id(uid, name or "Other", commit=False)
+            # Rows without a user only get built-in categories; anything else is filed under Other
+            if name not in unowned:
+                unowned[name] = self._find_category(None, name or "Other") or self._find_category(None, "Other")
+            return unowned[name]
+        
+        count = 0
+        restored_users = set()
+        unowned = {}
+        try:
+            if user_id is not None:
+                self._lock_user(user_id)
+                restored_users.add(user_id)
+                self.cursor.execute("DELETE FROM expenses WHERE user_id=%s", (user_id,))
+            for batch in self._iter_snapshot_batches(source, fmt):
+                columns = batch.to_pydict()
+                user_ids = columns["user_id"] if user_id is None else [user_id] * batch.num_rows
+                # Lock users before their categories and expenses are written, in a fixed order
+                for uid in sorted(set(uid for uid in user_ids if uid is not None) - restored_users):
+                    self._lock_user(uid)
+                    restored_users.add(uid)
+                category_ids = [category_id(uid, name) for uid, name in zip(user_ids, columns["category"])]
+                if user_id is None:
+                    rows = list(zip(columns["id"], user_ids, columns["expense_name"], category_ids,
+                                    columns["amount"], columns["exp_date"], columns["exp_time"], columns["created_at"]))
+                else:
+                    rows = list(zip(user_ids, columns["expense_name"], category_ids,
+                                    columns["amount"], columns["exp_date"], columns["exp_time"], columns["created_at"]))
+                self.cursor.executemany(sql, rows)
+                count += len(rows)
+            # One marker per user instead of a change row per restored expense
+            for uid in restored_users:
+                self._log_change(uid, None, "reload")
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            self._category_cache.clear()
+            raise
+        return count
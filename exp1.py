@@ -1,189 +1,160 @@
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
-import mysql.connector
 from datetime import datetime, timedelta
-import hashlib
+import argparse
+import http.client
+import json
+import os
+import shutil
+import urllib.error
+import urllib.parse
+import urllib.request
+import mysql.connector
 from fpdf import FPDF
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 import pandas as pd
 from openpyxl import Workbook
 from openpyxl.styles import Font, PatternFill, Alignment
+from db import Database, snapshot_format, snapshot_row_count
 
-class Database:
-    def __init__(self):
-        try:
-            temp_conn = mysql.connector.connect(
-                host="localhost",
-                user="root",
-                password="root"
-            )
-            temp_cursor = temp_conn.cursor()
-            temp_cursor.execute("CREATE DATABASE IF NOT EXISTS expense_tracker")
-            temp_conn.close()
-        except mysql.connector.Error as err:
-            messagebox.showerror("Database Error", f"MySQL connection failed!\n\nError: {err}")
-            raise
-        
+SYNC_INTERVAL_MS = 3000
+
+SNAPSHOT_FILETYPES = [("Parquet", "*.parquet"), ("Feather", "*.feather")]
+
+TRANSFER_CHUNK_SIZE = 1024 * 1024
+
+# Seconds; requests run on the Tk thread, so a stalled server must not hang the UI
+REQUEST_TIMEOUT = 10
+SYNC_REQUEST_TIMEOUT = 2
+SNAPSHOT_TIMEOUT = 600
+
+class ApiClient:
+    """Talks to a server.py instance and mirrors the Database methods used by the app."""
+    
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip("/")
+        self.token = None
+    
+    def _open(self, method, path, params=None, payload=None, data=None, content_type="application/json", headers=None,
+              timeout=REQUEST_TIMEOUT):
+        url = self.base_url + path
+        if params:
+            url += "?" + urllib.parse.urlencode({k: v for k, v in params.items() if v is not None})
+        if payload is not None:
+            data = json.dumps(payload).encode()
+        req = urllib.request.Request(url, data=data, method=method)
+        if data is not None:
+            req.add_header("Content-Type", content_type)
+        if self.token:
+            req.add_header("Authorization", f"Bearer {self.token}")
+        for name, value in (headers or {}).items():
+            req.add_header(name, value)
         try:
-            self.conn = mysql.connector.connect(
-                host="localhost",
-                user="root",
-                password="root",
-                database="expense_tracker"
-            )
-            self.cursor = self.conn.cursor()
-            self.create_tables()
-        except mysql.connector.Error as err:
-            messagebox.showerror("Database Error", f"Failed to connect: {err}")
-            raise
+            return urllib.request.urlopen(req, timeout=timeout)
+        except urllib.error.HTTPError as err:
+            try:
+                message = json.loads(err.read()).get("error", err.reason)
+            except ValueError:
+                message = err.reason
+            raise RuntimeError(f"Server error ({err.code}): {message}") from None
     
-    def create_tables(self):
-        self.cursor.execute("""
-            CREATE TABLE IF NOT EXISTS users (
-                id INT AUTO_INCREMENT PRIMARY KEY,
-                username VARCHAR(100) UNIQUE NOT NULL,
-                email VARCHAR(100) UNIQUE NOT NULL,
-                password VARCHAR(255) NOT NULL,
-                monthly_budget DECIMAL(10,2) DEFAULT 0,
-                dark_mode BOOLEAN DEFAULT FALSE,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                is_active BOOLEAN DEFAULT TRUE
-            )
-        """)
-        
-        self.cursor.execute("""
-            CREATE TABLE IF NOT EXISTS expenses (
-                id INT AUTO_INCREMENT PRIMARY KEY,
-                user_id INT,
-                expense_name VARCHAR(255),
-                category VARCHAR(100) DEFAULT 'Other',
-                amount DECIMAL(10,2),
-                exp_date DATE,
-                exp_time TIME,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (user_id) REFERENCES users(id)
-            )
-        """)
-        
-        admin_pass = hashlib.sha256("admin123".encode()).hexdigest()
-        try:
-            self.cursor.execute(
-                "INSERT INTO users (username, email, password) VALUES (%s, %s, %s)",
-                ("admin", "admin@expense.com", admin_pass)
-            )
-            self.conn.commit()
-        except:
-            pass
+    def _request(self, method, path, params=None, **kwargs):
+        with self._open(method, path, params, **kwargs) as resp:
+            return json.loads(resp.read())
+    
+    def _range(self, start_date, end_date):
+        return {"start": start_date, "end": end_date} if start_date and end_date else None
     
     def register_user(self, username, email, password):
-        hashed_pw = hashlib.sha256(password.encode()).hexdigest()
-        try:
-            self.cursor.execute(
-                "INSERT INTO users (username, email, password) VALUES (%s, %s, %s)",
-                (username, email, hashed_pw)
-            )
-            self.conn.commit()
-            return True
-        except mysql.connector.IntegrityError:
-            return False
+        return self._request("POST", "/api/register", payload={"username": username, "email": email, "password": password})["ok"]
     
     def login_user(self, username, password):
-        hashed_pw = hashlib.sha256(password.encode()).hexdigest()
-        self.cursor.execute(
-            "SELECT id, username, monthly_budget, dark_mode FROM users WHERE username=%s AND password=%s",
-            (username, hashed_pw)
-        )
-        return self.cursor.fetchone()
+        result = self._request("POST", "/api/login", payload={"username": username, "password": password})
+        self.token = result.get("token")
+        return result["user"]
+    
+    def logout(self):
+        try:
+            self._request("POST", "/api/logout")
+        finally:
+            self.token = None
     
     def add_expense(self, user_id, name, category, amount, date, time):
-        self.cursor.execute(
-            "INSERT INTO expenses (user_id, expense_name, category, amount, exp_date, exp_time) VALUES (%s, %s, %s, %s, %s, %s)",
-            (user_id, name, category, amount, date, time)
-        )
-        self.conn.commit()
+        self._request("POST", "/api/expenses", payload={"name": name, "category": category, "amount": amount, "date": date, "time": time})
     
-    def update_expense(self, exp_id, name, category, amount, date, time):
-        self.cursor.execute(
-            "UPDATE expenses SET expense_name=%s, category=%s, amount=%s, exp_date=%s, exp_time=%s WHERE id=%s",
-            (name, category, amount, date, time, exp_id)
-        )
-        self.conn.commit()
+    def update_expense(self, user_id, exp_id, name, category, amount, date, time):
+        self._request("PUT", f"/api/expenses/{exp_id}", payload={"name": name, "category": category, "amount": amount, "date": date, "time": time})
     
-    def delete_expense(self, exp_id):
-        self.cursor.execute("DELETE FROM expenses WHERE id=%s", (exp_id,))
-        self.conn.commit()
+    def delete_expense(self, user_id, exp_id):
+        self._request("DELETE", f"/api/expenses/{exp_id}")
     
     def get_expenses(self, user_id, start_date=None, end_date=None):
-        if start_date and end_date:
-            self.cursor.execute(
-                "SELECT id, expense_name, category, amount, exp_date, exp_time FROM expenses WHERE user_id=%s AND exp_date BETWEEN %s AND %s ORDER BY exp_date DESC",
-                (user_id, start_date, end_date)
-            )
-        else:
-            self.cursor.execute(
-                "SELECT id, expense_name, category, amount, exp_date, exp_time FROM expenses WHERE user_id=%s ORDER BY exp_date DESC",
-                (user_id,)
-            )
-        return self.cursor.fetchall()
+        return self._request("GET", "/api/expenses", self._range(start_date, end_date))["expenses"]
     
     def get_total_expense(self, user_id, start_date=None, end_date=None):
-        if start_date and end_date:
-            self.cursor.execute(
-                "SELECT SUM(amount) FROM expenses WHERE user_id=%s AND exp_date BETWEEN %s AND %s",
-                (user_id, start_date, end_date)
-            )
-        else:
-            self.cursor.execute(
-                "SELECT SUM(amount) FROM expenses WHERE user_id=%s",
-                (user_id,)
-            )
-        result = self.cursor.fetchone()[0]
-        return result if result else 0
+        return self._request("GET", "/api/total", self._range(start_date, end_date))["total"]
     
     def get_category_totals(self, user_id, start_date=None, end_date=None):
-        if start_date and end_date:
-            self.cursor.execute(
-                "SELECT category, SUM(amount) FROM expenses WHERE user_id=%s AND exp_date BETWEEN %s AND %s GROUP BY category",
-                (user_id, start_date, end_date)
-            )
-        else:
-            self.cursor.execute(
-                "SELECT category, SUM(amount) FROM expenses WHERE user_id=%s GROUP BY category",
-                (user_id,)
-            )
-        return self.cursor.fetchall()
+        return self._request("GET", "/api/category-totals", self._range(start_date, end_date))["totals"]
+    
+    def get_change_seq(self, user_id):
+        return self._request("GET", "/api/changes")["seq"]
+    
+    def get_changes(self, user_id, since_seq):
+        # Polled every few seconds; fail fast so a stalled server only costs one skipped tick
+        result = self._request("GET", "/api/changes", {"since": since_seq}, timeout=SYNC_REQUEST_TIMEOUT)
+        return result["seq"], result["changes"]
+    
+    def get_categories(self, user_id):
+        return self._request("GET", "/api/categories")["categories"]
+    
+    def add_category(self, user_id, name):
+        return self._request("POST", "/api/categories", payload={"name": name})["ok"]
     
     def update_budget(self, user_id, budget):
-        self.cursor.execute("UPDATE users SET monthly_budget=%s WHERE id=%s", (budget, user_id))
-        self.conn.commit()
+        self._request("PUT", "/api/budget", payload={"budget": budget})
     
     def toggle_dark_mode(self, user_id, mode):
-        self.cursor.execute("UPDATE users SET dark_mode=%s WHERE id=%s", (mode, user_id))
-        self.conn.commit()
+        self._request("PUT", "/api/dark-mode", payload={"mode": mode})
     
     def get_all_users(self):
-        self.cursor.execute(
-            "SELECT username, email, created_at, is_active FROM users WHERE username != 'admin'"
-        )
-        return self.cursor.fetchall()
+        return self._request("GET", "/api/users")["users"]
+    
+    def export_expenses_snapshot(self, sink, user_id=None, fmt="parquet"):
+        params = {"format": fmt, "scope": "all" if user_id is None else "user"}
+        try:
+            with self._open("GET", "/api/snapshot", params, timeout=SNAPSHOT_TIMEOUT) as resp, open(sink, "wb") as f:
+                shutil.copyfileobj(resp, f, TRANSFER_CHUNK_SIZE)
+        except Exception:
+            # Don't leave a truncated snapshot behind
+            if os.path.exists(sink):
+                os.remove(sink)
+            raise
+        return snapshot_row_count(sink, fmt)
+    
+    def restore_expenses_snapshot(self, source, user_id=None, fmt="parquet"):
+        params = {"format": fmt, "scope": "all" if user_id is None else "user"}
+        # urllib sends a file object in blocks instead of reading it into memory
+        with open(source, "rb") as f:
+            return self._request("POST", "/api/snapshot", params, data=f, content_type="application/octet-stream",
+                                 headers={"Content-Length": str(os.path.getsize(source))}, timeout=SNAPSHOT_TIMEOUT)["count"]
 
 class ExpenseTrackerApp:
-    def __init__(self, root):
+    def __init__(self, root, server_url=None):
         self.root = root
         self.root.title("Advanced Expense Tracker Pro")
         self.root.geometry("1200x750")
         
-        self.CATEGORIES = ["Food & Dining", "Transportation", "Shopping", "Healthcare", 
-                          "Entertainment", "Bills & Utilities", "Education", "Other"]
-        
         try:
-            self.db = Database()
+            self.db = ApiClient(server_url) if server_url else Database()
             self.current_user = None
             self.dark_mode = False
+            self.sync_job = None
+            self.chart_fig = None
             self.show_login()
         except Exception as e:
-            messagebox.showerror("Startup Error", "Failed to initialize application!")
+            messagebox.showerror("Startup Error", f"Failed to initialize application!\n\nError: {e}")
             self.root.destroy()
     
     def apply_theme(self):
@@ -203,9 +174,22 @@ class ExpenseTrackerApp:
         self.root.configure(bg=self.bg_color)
     
     def clear_window(self):
+        if self.sync_job:
+            self.root.after_cancel(self.sync_job)
+            self.sync_job = None
         for widget in self.root.winfo_children():
             widget.destroy()
     
+    def logout(self):
+        if isinstance(self.db, ApiClient):
+            try:
+                self.db.logout()
+            except (urllib.error.URLError, TimeoutError, RuntimeError):
+                # Server unreachable: the session still expires on its own
+                pass
+        self.current_user = None
+        self.show_login()
+    
     def show_login(self):
         self.clear_window()
         self.root.configure(bg="#f0f0f0")
@@ -278,6 +262,8 @@ class ExpenseTrackerApp:
     def show_home(self):
         self.clear_window()
         self.apply_theme()
+        # Taken before loading so nothing committed meanwhile is missed; replays are harmless
+        self.change_seq = self.db.get_change_seq(self.current_user['id'])
         
         # Top Navigation Bar
         nav_frame = tk.Frame(self.root, bg=self.highlight, height=70)
@@ -297,7 +283,7 @@ class ExpenseTrackerApp:
                  command=self.set_budget, cursor="hand2").pack(side="left", padx=5)
         
         tk.Button(btn_frame, text="🚪 Logout", bg="#f44336", fg="white", font=("Arial", 10),
-                 command=self.show_login, cursor="hand2").pack(side="left", padx=5)
+                 command=self.logout, cursor="hand2").pack(side="left", padx=5)
         
         # Main Container
         main_container = tk.Frame(self.root, bg=self.bg_color)
@@ -327,6 +313,8 @@ class ExpenseTrackerApp:
         
         # Action Buttons
         self.create_action_buttons(left_panel)
+        
+        self.sync_job = self.root.after(SYNC_INTERVAL_MS, self.poll_changes)
     
     def create_summary_cards(self, parent):
         cards_frame = tk.Frame(parent, bg=self.bg_color)
@@ -336,35 +324,45 @@ class ExpenseTrackerApp:
         card1 = tk.Frame(cards_frame, bg="#4CAF50", relief="raised", bd=2)
         card1.pack(side="left", fill="both", expand=True, padx=(0, 5))
         
-        total = self.db.get_total_expense(self.current_user['id'])
         tk.Label(card1, text="💰 Total Expenses", font=("Arial", 12, "bold"), bg="#4CAF50", fg="white").pack(pady=(10, 5))
-        tk.Label(card1, text=f"₹{total:.2f}", font=("Arial", 20, "bold"), bg="#4CAF50", fg="white").pack(pady=(0, 10))
+        self.total_label = tk.Label(card1, font=("Arial", 20, "bold"), bg="#4CAF50", fg="white")
+        self.total_label.pack(pady=(0, 10))
         
         # Monthly Budget Card
         card2 = tk.Frame(cards_frame, bg="#FF9800", relief="raised", bd=2)
         card2.pack(side="left", fill="both", expand=True, padx=5)
         
+        tk.Label(card2, text="🎯 Budget Status", font=("Arial", 12, "bold"), bg="#FF9800", fg="white").pack(pady=(10, 5))
+        self.budget_label = tk.Label(card2, font=("Arial", 16, "bold"), bg="#FF9800", fg="white")
+        self.budget_label.pack(pady=(0, 10))
+        
+        # This Month Card
+        card3 = tk.Frame(cards_frame, bg="#2196F3", relief="raised", bd=2)
+        card3.pack(side="left", fill="both", expand=True, padx=(5, 0))
+        
+        tk.Label(card3, text="📅 This Month", font=("Arial", 12, "bold"), bg="#2196F3", fg="white").pack(pady=(10, 5))
+        self.month_label = tk.Label(card3, font=("Arial", 20, "bold"), bg="#2196F3", fg="white")
+        self.month_label.pack(pady=(0, 10))
+        
+        self.refresh_summary_cards()
+    
+    def refresh_summary_cards(self):
+        total = self.db.get_total_expense(self.current_user['id'])
+        self.total_label.config(text=f"₹{total:.2f}")
+        
         budget = self.current_user.get('budget', 0)
         remaining = budget - total if budget > 0 else 0
         
-        tk.Label(card2, text="🎯 Budget Status", font=("Arial", 12, "bold"), bg="#FF9800", fg="white").pack(pady=(10, 5))
-        
         if budget > 0:
             status = f"₹{remaining:.2f} Left" if remaining > 0 else f"₹{abs(remaining):.2f} Over!"
-            tk.Label(card2, text=status, font=("Arial", 16, "bold"), bg="#FF9800", fg="white").pack(pady=(0, 10))
         else:
-            tk.Label(card2, text="Not Set", font=("Arial", 16, "bold"), bg="#FF9800", fg="white").pack(pady=(0, 10))
-        
-        # This Month Card
-        card3 = tk.Frame(cards_frame, bg="#2196F3", relief="raised", bd=2)
-        card3.pack(side="left", fill="both", expand=True, padx=(5, 0))
+            status = "Not Set"
+        self.budget_label.config(text=status)
         
         now = datetime.now()
         month_start = now.replace(day=1).strftime("%Y-%m-%d")
         month_total = self.db.get_total_expense(self.current_user['id'], month_start, now.strftime("%Y-%m-%d"))
-        
-        tk.Label(card3, text="📅 This Month", font=("Arial", 12, "bold"), bg="#2196F3", fg="white").pack(pady=(10, 5))
-        tk.Label(card3, text=f"₹{month_total:.2f}", font=("Arial", 20, "bold"), bg="#2196F3", fg="white").pack(pady=(0, 10))
+        self.month_label.config(text=f"₹{month_total:.2f}")
     
     def create_date_filter(self, parent):
         filter_frame = tk.LabelFrame(parent, text="📆 Date Range Filter", font=("Arial", 12, "bold"),
@@ -410,7 +408,10 @@ class ExpenseTrackerApp:
         
         tk.Label(inner, text="Category:", bg=self.frame_bg, fg=self.fg_color).grid(row=0, column=2, padx=5, pady=5)
         self.category_var = tk.StringVar(value="Other")
-        ttk.Combobox(inner, textvariable=self.category_var, values=self.CATEGORIES, width=15, state="readonly").grid(row=0, column=3, padx=5, pady=5)
+        self.category_combo = ttk.Combobox(inner, textvariable=self.category_var, values=self.db.get_categories(self.current_user['id']),
+                                           width=15, state="readonly")
+        self.category_combo.grid(row=0, column=3, padx=5, pady=5)
+        tk.Button(inner, text="➕", bg="#2196F3", fg="white", command=self.add_category).grid(row=0, column=6, padx=5, pady=5)
         
         tk.Label(inner, text="Amount:", bg=self.frame_bg, fg=self.fg_color).grid(row=0, column=4, padx=5, pady=5)
         self.amount_var = tk.StringVar()
@@ -468,9 +469,18 @@ class ExpenseTrackerApp:
         self.load_expenses()
     
     def create_charts(self, parent):
-        chart_frame = tk.LabelFrame(parent, text="📈 Expense Analytics", font=("Arial", 12, "bold"),
-                                    bg=self.frame_bg, fg=self.fg_color, relief="raised", bd=2)
-        chart_frame.pack(fill="both", expand=True)
+        self.chart_frame = tk.LabelFrame(parent, text="📈 Expense Analytics", font=("Arial", 12, "bold"),
+                                         bg=self.frame_bg, fg=self.fg_color, relief="raised", bd=2)
+        self.chart_frame.pack(fill="both", expand=True)
+        
+        self.refresh_chart()
+    
+    def refresh_chart(self):
+        for widget in self.chart_frame.winfo_children():
+            widget.destroy()
+        if self.chart_fig is not None:
+            plt.close(self.chart_fig)
+            self.chart_fig = None
         
         # Get category data
         cat_data = self.db.get_category_totals(self.current_user['id'])
@@ -481,16 +491,17 @@ class ExpenseTrackerApp:
             
             # Create pie chart
             fig, ax = plt.subplots(figsize=(4, 3.5), facecolor='none' if self.dark_mode else 'white')
+            self.chart_fig = fig
             colors = ['#FF6384', '#36A2EB', '#FFCE56', '#4BC0C0', '#9966FF', '#FF9F40', '#FF6384', '#C9CBCF']
             
             ax.pie(amounts, labels=categories, autopct='%1.1f%%', startangle=90, colors=colors[:len(categories)])
             ax.set_title("Expenses by Category", fontsize=12, color=self.fg_color)
             
-            canvas = FigureCanvasTkAgg(fig, chart_frame)
+            canvas = FigureCanvasTkAgg(fig, self.chart_frame)
             canvas.draw()
             canvas.get_tk_widget().pack(pady=10, padx=10)
         else:
-            tk.Label(chart_frame, text="No data to display", font=("Arial", 14), 
+            tk.Label(self.chart_frame, text="No data to display", font=("Arial", 14), 
                     bg=self.frame_bg, fg=self.fg_color).pack(expand=True)
     
     def create_action_buttons(self, parent):
@@ -501,20 +512,78 @@ class ExpenseTrackerApp:
                  width=18, height=2, command=self.generate_pdf).pack(side="left", padx=(0, 5))
         
         tk.Button(action_frame, text="📊 Export to Excel", bg="#00796B", fg="white", font=("Arial", 11, "bold"),
-                 width=18, height=2, command=self.export_to_excel).pack(side="left")
+                 width=18, height=2, command=self.export_to_excel).pack(side="left", padx=(0, 5))
+        
+        tk.Button(action_frame, text="🗄️ Export Snapshot", bg="#455A64", fg="white", font=("Arial", 11, "bold"),
+                 width=18, height=2, command=self.export_snapshot).pack(side="left", padx=(0, 5))
+        
+        tk.Button(action_frame, text="♻️ Restore Snapshot", bg="#795548", fg="white", font=("Arial", 11, "bold"),
+                 width=18, height=2, command=self.restore_snapshot).pack(side="left")
+    
+    def expense_values(self, exp):
+        return (exp[0], exp[1], exp[2], f"₹{exp[3]:.2f}", exp[4], exp[5])
     
     def load_expenses(self, start_date=None, end_date=None):
         for item in self.tree.get_children():
             self.tree.delete(item)
         
+        self.active_range = (start_date, end_date)
         expenses = self.db.get_expenses(self.current_user['id'], start_date, end_date)
         for exp in expenses:
-            self.tree.insert("", "end", values=(exp[0], exp[1], exp[2], f"₹{exp[3]:.2f}", exp[4], exp[5]))
+            self.tree.insert("", "end", iid=str(exp[0]), values=self.expense_values(exp))
+    
+    def poll_changes(self):
+        self.sync_job = None
+        try:
+            seq, changes = self.db.get_changes(self.current_user['id'], self.change_seq)
+            if changes:
+                if any(exp_id is None for exp_id, _ in changes):
+                    self.load_expenses(*self.active_range)
+                else:
+                    for exp_id, exp in changes:
+                        self.apply_expense_change(exp_id, exp)
+                self.refresh_summary_cards()
+                self.refresh_chart()
+                # Only advanced once applied, so a tick that fails halfway is replayed (deltas are idempotent)
+                self.change_seq = seq
+        except (urllib.error.URLError, TimeoutError, ConnectionError, http.client.HTTPException,
+                mysql.connector.Error, RuntimeError):
+            # Server or database unreachable, timed out or erroring (ApiClient raises RuntimeError for HTTP errors):
+            # skip this tick and retry from the same point on the next one
+            pass
+        except Exception as e:
+            # Anything else is a bug that every retry would hit again, so report it once and stop polling
+            messagebox.showerror("Error", f"Live updates stopped: {e}")
+            return
+        self.sync_job = self.root.after(SYNC_INTERVAL_MS, self.poll_changes)
+    
+    def apply_expense_change(self, exp_id, exp):
+        iid = str(exp_id)
+        start, end = self.active_range
+        visible = exp is not None and (not (start and end) or start <= str(exp[4]) <= end)
+        
+        if exp is None and self.edit_id == exp_id:
+            self.clear_form()
+        
+        if self.tree.exists(iid):
+            if visible and self.tree.set(iid, "Date") == str(exp[4]):
+                self.tree.item(iid, values=self.expense_values(exp))
+                return
+            self.tree.delete(iid)
+        
+        if visible:
+            # Keep the list ordered by date, newest first
+            index = "end"
+            for i, child in enumerate(self.tree.get_children()):
+                if self.tree.set(child, "Date") < str(exp[4]):
+                    index = i
+                    break
+            self.tree.insert("", index, iid=iid, values=self.expense_values(exp))
     
     def save_expense(self):
         try:
             if self.edit_id:
-                self.db.update_expense(self.edit_id, self.name_var.get(), self.category_var.get(),
+                self.db.update_expense(self.current_user['id'], self.edit_id, self.name_var.get(), self.category_var.get(),
                                       float(self.amount_var.get()), self.date_var.get(), self.time_var.get())
                 messagebox.showinfo("Success", "Expense updated!")
             else:
@@ -527,6 +596,22 @@ class ExpenseTrackerApp:
         except Exception as e:
             messagebox.showerror("Error", f"Failed: {str(e)}")
     
+    def add_category(self):
+        name = tk.simpledialog.askstring("New Category", "Enter category name:")
+        if not name or not name.strip():
+            return
+        name = name.strip()
+        try:
+            added = self.db.add_category(self.current_user['id'], name)
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed: {str(e)}")
+            return
+        if added:
+            self.category_combo['values'] = self.db.get_categories(self.current_user['id'])
+            self.category_var.set(name)
+        else:
+            messagebox.showerror("Error", "Category already exists!")
+    
     def edit_expense(self):
         selected = self.tree.selection()
         if not selected:
@@ -552,7 +637,7 @@ class ExpenseTrackerApp:
         if messagebox.askyesno("Confirm", "Are you sure you want to delete this expense?"):
             item = self.tree.item(selected[0])
             exp_id = item['values'][0]
-            self.db.delete_expense(exp_id)
+            self.db.delete_expense(self.current_user['id'], exp_id)
             messagebox.showinfo("Success", "Expense deleted!")
             self.show_home()
     
@@ -689,6 +774,40 @@ class ExpenseTrackerApp:
         wb.save(filename)
         messagebox.showinfo("Success", f"Excel file saved as {filename}")
     
+    def export_snapshot(self, user_id="current"):
+        # Admin passes user_id=None to dump the whole expenses table
+        if user_id == "current":
+            user_id = self.current_user['id']
+        filename = filedialog.asksaveasfilename(
+            defaultextension=".parquet", filetypes=SNAPSHOT_FILETYPES,
+            initialfile=f"expenses_{self.current_user['username']}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.parquet"
+        )
+        if not filename:
+            return
+        try:
+            count = self.db.export_expenses_snapshot(filename, user_id, snapshot_format(filename))
+            messagebox.showinfo("Success", f"{count} expenses saved to {filename}")
+        except Exception as e:
+            messagebox.showerror("Error", f"Export failed: {str(e)}")
+    
+    def restore_snapshot(self, user_id="current"):
+        if user_id == "current":
+            user_id = self.current_user['id']
+        filename = filedialog.askopenfilename(filetypes=SNAPSHOT_FILETYPES)
+        if not filename:
+            return
+        if user_id is not None and not messagebox.askyesno(
+                "Confirm", "Restoring replaces all of your current expenses with the snapshot. Continue?"):
+            return
+        try:
+            count = self.db.restore_expenses_snapshot(filename, user_id, snapshot_format(filename))
+            messagebox.showinfo("Success", f"{count} expenses restored from {filename}")
+        except Exception as e:
+            messagebox.showerror("Error", f"Restore failed: {str(e)}")
+            return
+        if user_id is not None:
+            self.show_home()
+    
     def show_admin_dashboard(self):
         self.clear_window()
         self.root.configure(bg="#f0f0f0")
@@ -699,7 +818,13 @@ class ExpenseTrackerApp:
                 bg="#673AB7", fg="white").pack(pady=20)
         
         tk.Button(header, text="Logout", bg="#f44336", fg="white", font=("Arial", 11),
-                 command=self.show_login).place(relx=0.95, rely=0.3, anchor="e")
+                 command=self.logout).place(relx=0.95, rely=0.3, anchor="e")
+        
+        tk.Button(header, text="🗄️ Export All", bg="#455A64", fg="white", font=("Arial", 11),
+                 command=lambda: self.export_snapshot(None)).place(relx=0.05, rely=0.3, anchor="w")
+        
+        tk.Button(header, text="♻️ Restore All", bg="#795548", fg="white", font=("Arial", 11),
+                 command=lambda: self.restore_snapshot(None)).place(relx=0.15, rely=0.3, anchor="w")
         
         list_frame = tk.LabelFrame(self.root, text="👥 Registered Users", font=("Arial", 14, "bold"), 
                                    bg="#ffffff", padx=20, pady=10)
@@ -728,6 +853,10 @@ class ExpenseTrackerApp:
                 bg="#ffffff").pack(pady=15)
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Advanced Expense Tracker Pro")
+    parser.add_argument("--server", help="URL of a server.py instance, e.g. http://127.0.0.1:8765")
+    args = parser.parse_args()
+    
     root = tk.Tk()
-    app = ExpenseTrackerApp(root)
+    app = ExpenseTrackerApp(root, args.server)
     root.mainloop()
\ No newline at end of file
@@ -0,0 +1,73 @@
+"""Load test for a local server.py instance.
+
+Each simulated client registers (or reuses) its own user, logs in and then
+loops over a typical desktop workload until the duration is up.
+
+    python load_test.py --url http://127.0.0.1:8765 --clients 50 --duration 30
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+from datetime import datetime
+
+import aiohttp
+
+from db import DEFAULT_CATEGORIES
+
+
+async def timed(session, latencies, method, path, **kwargs):
+    start = time.perf_counter()
+    async with session.request(method, path, **kwargs) as resp:
+        await resp.read()
+        resp.raise_for_status()
+    latencies.setdefault(f"{method} {path.split('?')[0]}", []).append(time.perf_counter() - start)
+
+
+async def client(base_url, index, deadline, latencies, errors):
+    username = f"loadtest_{index}"
+    async with aiohttp.ClientSession(base_url) as session:
+        await session.post("/api/register", json={"username": username, "email": f"{username}@loadtest.local", "password": "loadtest"})
+        async with session.post("/api/login", json={"username": username, "password": "loadtest"}) as resp:
+            token = (await resp.json())["token"]
+        session.headers["Authorization"] = f"Bearer {token}"
+
+        while time.monotonic() < deadline:
+            now = datetime.now()
+            try:
+                await timed(session, latencies, "POST", "/api/expenses", json={
+                    "name": f"Load test {random.randint(1, 1000)}",
+                    "category": random.choice(DEFAULT_CATEGORIES),
+                    "amount": round(random.uniform(1, 500), 2),
+                    "date": now.strftime("%Y-%m-%d"),
+                    "time": now.strftime("%H:%M"),
+                })
+                await timed(session, latencies, "GET", "/api/expenses")
+                await timed(session, latencies, "GET", "/api/total")
+                await timed(session, latencies, "GET", "/api/category-totals")
+            except aiohttp.ClientError:
+                errors.append(index)
+
+
+async def main(args):
+    latencies, errors = {}, []
+    started = time.monotonic()
+    deadline = started + args.duration
+    await asyncio.gather(*(client(args.url, i, deadline, latencies, errors) for i in range(args.clients)))
+    elapsed = time.monotonic() - started
+
+    total = sum(len(samples) for samples in latencies.values())
+    print(f"{args.clients} clients, {elapsed:.1f}s, {total} requests, {total / elapsed:.1f} req/s, {len(errors)} errors")
+    for name, samples in sorted(latencies.items()):
+        samples.sort()
+        p95 = samples[int(len(samples) * 0.95) - 1] if len(samples) >= 20 else samples[-1]
+        print(f"  {name:<28} n={len(samples):<7} mean={statistics.mean(samples) * 1000:7.1f}ms  p95={p95 * 1000:7.1f}ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test a local expense tracker server")
+    parser.add_argument("--url", default="http://127.0.0.1:8765")
+    parser.add_argument("--clients", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=30)
+    asyncio.run(main(parser.parse_args()))
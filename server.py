@@ -0,0 +1,337 @@
+"""Headless JSON API for the expense tracker.
+
+Runs the Database operations behind an asyncio HTTP server so many desktop
+clients (python exp1.py --server http://host:port) share one pooled backend.
+
+    python server.py --host 127.0.0.1 --port 8765 --pool-size 8
+"""
+import argparse
+import asyncio
+import io
+import json
+import logging
+import os
+import queue
+import secrets
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+import mysql.connector
+import pyarrow as pa
+from aiohttp import web
+
+from db import SNAPSHOT_FORMATS, Database
+
+MAX_UPLOAD_SIZE = 1024 ** 3
+TRANSFER_CHUNK_SIZE = 1024 * 1024
+PRUNE_INTERVAL_S = 3600
+# Sliding: every request from a session pushes its expiry out again
+SESSION_TTL_S = 8 * 3600
+
+
+class DatabasePool:
+    """A fixed set of Database connections used from a thread pool of the same size."""
+
+    def __init__(self, size, **connect_args):
+        self.executor = ThreadPoolExecutor(max_workers=size, thread_name_prefix="db")
+        self._idle = queue.Queue()
+        # Each connection keeps its own category cache: a restore caches ids it has not committed yet
+        for _ in range(size):
+            self._idle.put(Database(**connect_args))
+
+    def _call(self, method, args):
+        db = self._idle.get()
+        try:
+            db.ensure_connection()
+            return getattr(db, method)(*args)
+        except Exception:
+            try:
+                db.conn.rollback()
+            except mysql.connector.Error:
+                # The connection itself is broken; ensure_connection replaces it on its next use
+                logging.getLogger(__name__).warning("Rollback after a failed %s call failed", method, exc_info=True)
+            raise
+        finally:
+            self._idle.put(db)
+
+    async def run(self, method, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, self._call, method, args)
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+        while not self._idle.empty():
+            self._idle.get().conn.close()
+
+
+class ResponseSink(io.RawIOBase):
+    """File object that a worker thread writes to; each write is sent on the event loop."""
+
+    def __init__(self, response, loop):
+        self.response = response
+        self.loop = loop
+        self.position = 0
+        self.aborted = False
+
+    def writable(self):
+        return True
+
+    def tell(self):
+        return self.position
+
+    def write(self, data):
+        if self.aborted:
+            return len(data)
+        # Blocks the worker until the bytes are handed to the transport, so a slow client applies backpressure
+        asyncio.run_coroutine_threadsafe(self.response.write(bytes(data)), self.loop).result()
+        self.position += len(data)
+        return len(data)
+
+
+def to_json(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    if isinstance(value, timedelta):
+        return str(value)
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+def json_response(data, status=200):
+    return web.json_response(data, status=status, dumps=lambda obj: json.dumps(obj, default=to_json))
+
+
+def date_range(request):
+    start, end = request.query.get("start"), request.query.get("end")
+    return (start, end) if start and end else (None, None)
+
+
+class ExpenseServer:
+    def __init__(self, pool):
+        self.pool = pool
+        # token -> {"id": ..., "username": ..., "expires": time.monotonic() deadline}
+        self.sessions = {}
+
+    @web.middleware
+    async def middleware(self, request, handler):
+        if request.path not in ("/api/login", "/api/register"):
+            request["token"] = request.headers.get("Authorization", "").removeprefix("Bearer ")
+            request["user"] = self.session_user(request["token"])
+            if request["user"] is None:
+                return json_response({"error": "Not logged in"}, status=401)
+        try:
+            return await handler(request)
+        except web.HTTPException:
+            raise
+        except Exception as e:
+            return json_response({"error": str(e)}, status=500)
+
+    def session_user(self, token):
+        session = self.sessions.get(token)
+        if session is None:
+            return None
+        now = time.monotonic()
+        if session["expires"] < now:
+            del self.sessions[token]
+            return None
+        session["expires"] = now + SESSION_TTL_S
+        return session
+    
+    def require_admin(self, request):
+        if request["user"]["username"] != "admin":
+            raise web.HTTPForbidden(text=json.dumps({"error": "Admin only"}), content_type="application/json")
+
+    def snapshot_params(self, request):
+        # Checked before the export response is started, so bad input is a 400 instead of a broken 200.
+        # scope=all exports or restores every user's expenses and is admin only.
+        fmt = request.query.get("format", "parquet")
+        if fmt not in SNAPSHOT_FORMATS:
+            raise web.HTTPBadRequest(text=json.dumps({"error": f"Unsupported snapshot format: {fmt}"}),
+                                     content_type="application/json")
+        scope = request.query.get("scope", "user")
+        if scope not in ("user", "all"):
+            raise web.HTTPBadRequest(text=json.dumps({"error": f"Unknown snapshot scope: {scope}"}),
+                                     content_type="application/json")
+        if scope == "all":
+            self.require_admin(request)
+            return None, fmt
+        return request["user"]["id"], fmt
+
+    async def register(self, request):
+        body = await request.json()
+        ok = await self.pool.run("register_user", body["username"], body["email"], body["password"])
+        return json_response({"ok": ok})
+
+    async def login(self, request):
+        body = await request.json()
+        user = await self.pool.run("login_user", body["username"], body["password"])
+        if not user:
+            return json_response({"user": None})
+        # Drop sessions that expired without a logout so the table does not grow forever
+        now = time.monotonic()
+        self.sessions = {token: session for token, session in self.sessions.items() if session["expires"] >= now}
+        token = secrets.token_urlsafe(32)
+        self.sessions[token] = {"id": user[0], "username": user[1], "expires": now + SESSION_TTL_S}
+        return json_response({"user": list(user), "token": token})
+    
+    async def logout(self, request):
+        self.sessions.pop(request["token"], None)
+        return json_response({"ok": True})
+
+    async def list_expenses(self, request):
+        rows = await self.pool.run("get_expenses", request["user"]["id"], *date_range(request))
+        return json_response({"expenses": [list(row) for row in rows]})
+
+    async def add_expense(self, request):
+        body = await request.json()
+        await self.pool.run("add_expense", request["user"]["id"], body["name"], body["category"],
+                            body["amount"], body["date"], body["time"])
+        return json_response({"ok": True}, status=201)
+
+    async def update_expense(self, request):
+        body = await request.json()
+        await self.pool.run("update_expense", request["user"]["id"], int(request.match_info["exp_id"]), body["name"],
+                            body["category"], body["amount"], body["date"], body["time"])
+        return json_response({"ok": True})
+
+    async def delete_expense(self, request):
+        await self.pool.run("delete_expense", request["user"]["id"], int(request.match_info["exp_id"]))
+        return json_response({"ok": True})
+
+    async def total(self, request):
+        total = await self.pool.run("get_total_expense", request["user"]["id"], *date_range(request))
+        return json_response({"total": total})
+
+    async def category_totals(self, request):
+        rows = await self.pool.run("get_category_totals", request["user"]["id"], *date_range(request))
+        return json_response({"totals": [list(row) for row in rows]})
+
+    async def changes(self, request):
+        user_id = request["user"]["id"]
+        if "since" not in request.query:
+            return json_response({"seq": await self.pool.run("get_change_seq", user_id)})
+        seq, changes = await self.pool.run("get_changes", user_id, int(request.query["since"]))
+        return json_response({"seq": seq, "changes": [[exp_id, row and list(row)] for exp_id, row in changes]})
+
+    async def list_categories(self, request):
+        return json_response({"categories": await self.pool.run("get_categories", request["user"]["id"])})
+
+    async def add_category(self, request):
+        body = await request.json()
+        return json_response({"ok": await self.pool.run("add_category", request["user"]["id"], body["name"])})
+
+    async def update_budget(self, request):
+        body = await request.json()
+        await self.pool.run("update_budget", request["user"]["id"], body["budget"])
+        return json_response({"ok": True})
+
+    async def update_dark_mode(self, request):
+        body = await request.json()
+        await self.pool.run("toggle_dark_mode", request["user"]["id"], body["mode"])
+        return json_response({"ok": True})
+
+    async def list_users(self, request):
+        self.require_admin(request)
+        users = await self.pool.run("get_all_users")
+        return json_response({"users": [list(row) for row in users]})
+
+    async def export_snapshot(self, request):
+        user_id, fmt = self.snapshot_params(request)
+        response = web.StreamResponse(headers={"Content-Type": "application/octet-stream"})
+        response.enable_chunked_encoding()
+        await response.prepare(request)
+
+        loop = asyncio.get_running_loop()
+        raw = ResponseSink(response, loop)
+        sink = pa.BufferedOutputStream(pa.PythonFile(raw, mode="w"), TRANSFER_CHUNK_SIZE)
+        try:
+            await self.pool.run("export_expenses_snapshot", sink, user_id, fmt)
+            # Flushing writes back through the event loop, so it must not run on it
+            await loop.run_in_executor(None, sink.close)
+        except Exception:
+            # Headers are already sent; dropping the connection makes the client see a truncated download
+            logging.getLogger(__name__).exception("Snapshot export failed")
+            # Whatever is still buffered is discarded instead of being flushed from the event loop
+            raw.aborted = True
+            sink.close()
+            request.transport.close()
+            return response
+        await response.write_eof()
+        return response
+
+    async def restore_snapshot(self, request):
+        user_id, fmt = self.snapshot_params(request)
+        # Spool the upload to disk in chunks; the restore then streams it batch by batch
+        fd, path = tempfile.mkstemp(suffix=".snapshot")
+        try:
+            size = 0
+            with os.fdopen(fd, "wb") as spool:
+                async for chunk in request.content.iter_chunked(TRANSFER_CHUNK_SIZE):
+                    size += len(chunk)
+                    if size > MAX_UPLOAD_SIZE:
+                        raise web.HTTPRequestEntityTooLarge(max_size=MAX_UPLOAD_SIZE, actual_size=size)
+                    spool.write(chunk)
+            count = await self.pool.run("restore_expenses_snapshot", path, user_id, fmt)
+        finally:
+            os.remove(path)
+        return json_response({"count": count})
+
+    def make_app(self):
+        app = web.Application(middlewares=[self.middleware])
+        app.add_routes([
+            web.post("/api/register", self.register),
+            web.post("/api/login", self.login),
+            web.post("/api/logout", self.logout),
+            web.get("/api/expenses", self.list_expenses),
+            web.post("/api/expenses", self.add_expense),
+            web.put("/api/expenses/{exp_id}", self.update_expense),
+            web.delete("/api/expenses/{exp_id}", self.delete_expense),
+            web.get("/api/total", self.total),
+            web.get("/api/category-totals", self.category_totals),
+            web.get("/api/changes", self.changes),
+            web.get("/api/categories", self.list_categories),
+            web.post("/api/categories", self.add_category),
+            web.put("/api/budget", self.update_budget),
+            web.put("/api/dark-mode", self.update_dark_mode),
+            web.get("/api/users", self.list_users),
+            web.get("/api/snapshot", self.export_snapshot),
+            web.post("/api/snapshot", self.restore_snapshot),
+        ])
+        app.cleanup_ctx.append(self.prune_changes_periodically)
+        app.on_cleanup.append(self.close)
+        return app
+
+    async def prune_changes_periodically(self, app):
+        # Database prunes the change log on connect; a long-running server also does it hourly
+        async def prune():
+            while True:
+                await asyncio.sleep(PRUNE_INTERVAL_S)
+                try:
+                    await self.pool.run("prune_changes")
+                except Exception:
+                    logging.getLogger(__name__).exception("Pruning the change log failed")
+
+        task = asyncio.create_task(prune())
+        yield
+        task.cancel()
+
+    async def close(self, app):
+        await asyncio.get_running_loop().run_in_executor(None, self.pool.close)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Expense tracker JSON API server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--pool-size", type=int, default=8, help="number of MySQL connections / worker threads")
+    parser.add_argument("--db-host", default="localhost")
+    parser.add_argument("--db-user", default="root")
+    parser.add_argument("--db-password", default="root")
+    args = parser.parse_args()
+
+    pool = DatabasePool(args.pool_size, host=args.db_host, user=args.db_user, password=args.db_password)
+    web.run_app(ExpenseServer(pool).make_app(), host=args.host, port=args.port)